@@ -3,6 +3,10 @@ import sys
 import random
 import math
 import traceback
+import bisect
+import json
+import os
+import spectator_server
 
 pygame.init()
 pygame.mixer.init()
@@ -36,6 +40,21 @@ LOSE_VOLUME = 0.8  # Volume for lose sound
 MUSIC_VOLUME = 0.1  # Volume for background music
 ALERT_VOLUME = 0.8  # Volume for alert sound
 
+# Asteroid sprite atlas settings
+ATLAS_SCALE_STEP = 1.05  # Size ratio between neighbouring steps of the scale ladder
+ATLAS_ROTATIONS = 8  # Rotation variants per size
+ATLAS_CELL_ALIGN = 4  # Cell widths are padded to this many pixels; odd widths miss SDL's fast alpha blit path
+ATLAS_MAX_BYTES = 16 * 1024 * 1024  # Atlas memory budget; the scale ladder is coarsened to fit
+ATLAS_CACHE_IMAGE = 'asteroid_atlas_cache.png'  # Packed atlas saved between runs
+ATLAS_CACHE_INFO = 'asteroid_atlas_cache.json'  # Cell layout and build settings for the cached atlas
+
+# Spectator server settings (local telemetry broadcast, start the game with --spectator)
+SPECTATOR_ENABLED = '--spectator' in sys.argv
+SPECTATOR_HOST = '127.0.0.1'  # Loopback only
+SPECTATOR_PORT = 8765
+SPECTATOR_SOCKET = None  # Unix domain socket path; replaces host/port when set
+SPECTATOR_RATE = 20  # Maximum updates per second sent to each spectator
+
 # Landing pad vertices for base polygon (at z=0)
 pad_vertices = [
     [-pad_size/2, -pad_size/2, 0],
@@ -85,31 +104,141 @@ for i in range(-1, 2):  # 3 lines each way
 target_radius = pad_size / 10
 
 # Generate random asteroids with unique properties
+asteroid_seed = random.randrange(2**32)  # Seed shared with spectators so they can rebuild the field
+asteroid_rng = random.Random(asteroid_seed)
 asteroids = []
 for _ in range(2000):  # 1000 asteroids
-    base_size = random.uniform(100, 200)  # Larger base size range for challenge
-    color = (random.randint(450, 750), random.randint(100, 150), random.randint(100, 150), 255)  # Grey colors
-    offsets = [(random.uniform(-base_size/1.5, base_size/1.5), random.uniform(-base_size/1.5, base_size/1.5), random.uniform(1, 1.5)) for _ in range(10)]  # 4 sub-circles
+    base_size = asteroid_rng.uniform(100, 200)  # Larger base size range for challenge
+    color = (asteroid_rng.randint(450, 750), asteroid_rng.randint(100, 150), asteroid_rng.randint(100, 150), 255)  # Grey colors
+    offsets = [(asteroid_rng.uniform(-base_size/1.5, base_size/1.5), asteroid_rng.uniform(-base_size/1.5, base_size/1.5), asteroid_rng.uniform(1, 1.5)) for _ in range(10)]  # 4 sub-circles
     asteroids.append({
-        'pos': [random.uniform(-4000, 4000), random.uniform(-4000, 4000), random.uniform(4000, 24000)],  # Tighter x/y and z range
+        'pos': [asteroid_rng.uniform(-4000, 4000), asteroid_rng.uniform(-4000, 4000), asteroid_rng.uniform(4000, 24000)],  # Tighter x/y and z range
         'size': base_size,
         'color': color,
         'offsets': offsets,
         'radius': base_size  # For collision detection
     })
 
-# Load and pre-scale asteroid image
+# Atlas rotation variants come from their own stream so the field stays reproducible from asteroid_seed
+rotation_rng = random.Random(asteroid_seed ^ 0x5A17E5)
+for ast in asteroids:
+    ast['rotation'] = rotation_rng.randrange(ATLAS_ROTATIONS)
+
+# Function to build the scale ladder: geometric steps, at least 1 pixel apart, ending at max_scale
+def atlas_ladder(step):
+    sizes = []
+    size = float(min_scale)
+    while round(size) < max_scale:
+        sizes.append(int(round(size)))
+        size = max(size * step, size + 1)
+    sizes.append(max_scale)
+    return sizes
+
+# Function to shelf-pack cell sizes (tallest first) into rows of atlas_w; returns rects and atlas height
+def pack_atlas(cell_sizes, atlas_w):
+    rects = [None] * len(cell_sizes)
+    x = y = shelf_h = 0
+    for i in sorted(range(len(cell_sizes)), key=lambda i: -cell_sizes[i][1]):
+        w, h = cell_sizes[i]
+        if x + w > atlas_w:
+            x, y, shelf_h = 0, y + shelf_h, 0
+        rects[i] = pygame.Rect(x, y, w, h)
+        x += w
+        shelf_h = max(shelf_h, h)
+    return rects, y + shelf_h
+
+# Function to build a square mip chain by exact halving down to min_scale.
+# smoothscale at non-integer ratios leaves opaque pixels at alpha 252-254, which SDL must blend
+# instead of copy; exact halves keep them at 255.
+def atlas_mip_levels(image):
+    base_size = min_scale
+    while base_size < max_scale * 2:
+        base_size *= 2
+    levels = [pygame.transform.scale(image, (base_size, base_size))]  # Squared, as the old cache scaled to squares
+    while levels[-1].get_width() > min_scale:
+        size = levels[-1].get_width() // 2
+        levels.append(pygame.transform.smoothscale(levels[-1], (size, size)))
+    return levels
+
+# Function to render one atlas cell: rotate and scale from the smallest mip level not below size, then
+# crop transparent margins. Returns the cropped sprite and its centre within the crop.
+def render_atlas_cell(levels, size, angle):
+    level = [level for level in levels if level.get_width() >= size][-1]
+    rotated = pygame.transform.rotozoom(level, angle, size / level.get_width())
+    bounds = rotated.get_bounding_rect()
+    return rotated.subsurface(bounds), rotated.get_width() / 2 - bounds.x, rotated.get_height() / 2 - bounds.y
+
+# Function to build the asteroid atlas: every ladder size in ATLAS_ROTATIONS rotations packed into one surface.
+# Cell index is size_index * ATLAS_ROTATIONS + rotation; offsets give the sprite centre within each cell.
+def build_asteroid_atlas(image):
+    levels = atlas_mip_levels(image)
+    step = ATLAS_SCALE_STEP
+    while True:
+        sizes = atlas_ladder(step)
+        cells = [render_atlas_cell(levels, size, rotation * 360 / ATLAS_ROTATIONS)
+                 for size in sizes for rotation in range(ATLAS_ROTATIONS)]
+        # Pad widths so every cell takes the fast blit path; the padding stays transparent
+        cell_sizes = [(-(-cropped.get_width() // ATLAS_CELL_ALIGN) * ATLAS_CELL_ALIGN, cropped.get_height()) for cropped, _, _ in cells]
+        # A strip as narrow as the widest cell keeps each cell's rows close together in memory; on a wide
+        # atlas, blits that cycle through many cells ran ~30% slower than separate surfaces
+        atlas_w = max(w for w, _ in cell_sizes)
+        rects, atlas_h = pack_atlas(cell_sizes, atlas_w)
+        if atlas_w * atlas_h * 4 <= ATLAS_MAX_BYTES or len(sizes) <= 2:
+            break
+        step += 0.01  # Over budget: fewer, coarser sizes
+    atlas = pygame.Surface((atlas_w, atlas_h), pygame.SRCALPHA).convert_alpha()
+    atlas.fill((0, 0, 0, 0))
+    offsets = []
+    for (cropped, center_x, center_y), rect in zip(cells, rects):
+        atlas.blit(cropped, rect.topleft, special_flags=pygame.BLEND_RGBA_MAX)  # Exact copy onto the cleared atlas
+        offsets.append((center_x, center_y))
+    return atlas, sizes, rects, offsets
+
+# Function to load the atlas from the on-disk cache, or build it and refresh the cache
+def load_asteroid_atlas(image):
+    key = {
+        'source_size': os.path.getsize('asteroid.png'),
+        'source_mtime': os.path.getmtime('asteroid.png'),
+        'min_scale': min_scale,
+        'max_scale': max_scale,
+        'step': ATLAS_SCALE_STEP,
+        'rotations': ATLAS_ROTATIONS,
+        'cell_align': ATLAS_CELL_ALIGN,
+        'max_bytes': ATLAS_MAX_BYTES
+    }
+    try:
+        with open(ATLAS_CACHE_INFO) as f:
+            info = json.load(f)
+        if info['key'] == key:
+            atlas = pygame.image.load(ATLAS_CACHE_IMAGE).convert_alpha()
+            rects = [pygame.Rect(rect) for rect in info['rects']]
+            offsets = [tuple(offset) for offset in info['offsets']]
+            return atlas, info['sizes'], rects, offsets
+    except (OSError, ValueError, KeyError, pygame.error):
+        pass  # Missing or stale cache, rebuild below
+    atlas, sizes, rects, offsets = build_asteroid_atlas(image)
+    try:
+        pygame.image.save(atlas, ATLAS_CACHE_IMAGE)
+        with open(ATLAS_CACHE_INFO, 'w') as f:
+            json.dump({'key': key, 'sizes': sizes, 'rects': [list(rect) for rect in rects], 'offsets': offsets}, f)
+    except (OSError, pygame.error) as e:
+        print(f"Warning: Could not save asteroid atlas cache: {e}")
+    return atlas, sizes, rects, offsets
+
+# Load asteroid image and build the sprite atlas
 try:
     asteroid_image = pygame.image.load('asteroid.png').convert_alpha()
-    # Create a cache of pre-scaled images
-    asteroid_image_cache = {}
-    for size in range(min_scale, max_scale + 1, 10):  # Cache sizes in steps of 10
-        asteroid_image_cache[size] = pygame.transform.scale(asteroid_image, (size, size))
+    asteroid_atlas, atlas_sizes, atlas_rects, atlas_offsets = load_asteroid_atlas(asteroid_image)
+    # Lookup from integer scale to the first cell of the largest ladder size not above it
+    atlas_index = [(bisect.bisect_right(atlas_sizes, scale) - 1) * ATLAS_ROTATIONS for scale in range(min_scale, max_scale + 1)]
+    atlas_bytes = asteroid_atlas.get_width() * asteroid_atlas.get_height() * asteroid_atlas.get_bytesize()
+    print(f"Asteroid atlas: {len(atlas_sizes)} sizes x {ATLAS_ROTATIONS} rotations in "
+          f"{asteroid_atlas.get_width()}x{asteroid_atlas.get_height()} ({atlas_bytes / (1024 * 1024):.1f} MB)")
 except pygame.error as e:
     print(f"Warning: Could not load asteroid image: {e}")
     traceback.print_exc()
     asteroid_image = None
-    asteroid_image_cache = None
+    asteroid_atlas = None
 
 # Load background image
 background_image = None
@@ -166,7 +295,7 @@ def get_bg_color(cam_z):
 
 # Restart function to reset game state
 def restart():
-    global cam_x, cam_y, cam_z, vx, vy, vz, fuel, is_thrusting, is_alerting, last_alert_time, last_scaled_background, last_zoom_factor
+    global cam_x, cam_y, cam_z, vx, vy, vz, fuel, is_thrusting, is_alerting, alert_reported, last_alert_time, last_scaled_background, last_zoom_factor
     cam_x = random.uniform(-200, 200)  # Starting offset
     cam_y = random.uniform(-200, 200)
     cam_z = initial_z
@@ -176,9 +305,12 @@ def restart():
     fuel = max_fuel
     is_thrusting = False
     is_alerting = False
+    alert_reported = False  # Report the first alert after a restart to spectators
     last_alert_time = 0  # Reset alert timer
     last_scaled_background = None
     last_zoom_factor = None
+    if spectator:
+        spectator.event('restart')
     try:
         pygame.mixer.music.load('interstellar_theme.mp3')
         pygame.mixer.music.set_volume(MUSIC_VOLUME)  # Set background music volume
@@ -274,8 +406,21 @@ def play_intro():
         clock.tick(60)
         frame += 1
 
+# Start spectator server if enabled
+spectator = None
+if SPECTATOR_ENABLED:
+    try:
+        spectator = spectator_server.SpectatorServer(SPECTATOR_HOST, SPECTATOR_PORT, SPECTATOR_SOCKET, SPECTATOR_RATE,
+                                                     info={'asteroid_seed': asteroid_seed, 'asteroid_count': len(asteroids), 'pad_size': pad_size}).start()
+        print(f"Spectator server listening on {spectator.address()}")
+    except OSError as e:
+        print(f"Warning: Could not start spectator server: {e}")
+        traceback.print_exc()
+        spectator = None
+
 # Initial game state
 last_alert_time = 0  # Initialize alert timer
+alert_reported = False  # Whether spectators have been told about the current alert
 fullscreen = False  # Track fullscreen state
 restart()
 
@@ -353,6 +498,8 @@ while running:
         dist = math.sqrt((cam_x - ast['pos'][0])**2 + (cam_y - ast['pos'][1])**2 + (cam_z - ast['pos'][2])**2)
         if dist < ast['radius'] + 10:  # Assume rover radius ~10
             # Crash on asteroid
+            if spectator:
+                spectator.event('crash', cause='asteroid', x=round(cam_x, 2), y=round(cam_y, 2), z=round(cam_z, 2))
             pygame.mixer.music.stop()
             if thrust_sound:
                 thrust_sound.stop()
@@ -373,13 +520,13 @@ while running:
             closest_ast = ast
         # Draw asteroid
         if p:
-            if asteroid_image_cache:
-                # Use pre-scaled image
+            if asteroid_atlas:
+                # Blit this asteroid's rotation variant at the atlas size snapped down from its scale
                 dz = ast['pos'][2] - cam_z
                 scale = max(min(int(focal_length / -dz * ast['size'] * 2), max_scale), min_scale)
-                scale = (scale // 10) * 10  # Snap to nearest cached size
-                scaled_image = asteroid_image_cache.get(scale, asteroid_image_cache[min_scale])
-                screen.blit(scaled_image, (int(p[0] - scale / 2), int(p[1] - scale / 2)))
+                cell = atlas_index[scale - min_scale] + ast['rotation']
+                offset_x, offset_y = atlas_offsets[cell]
+                screen.blit(asteroid_atlas, (int(p[0] - offset_x), int(p[1] - offset_y)), atlas_rects[cell])
             else:
                 # Fallback to drawn circles
                 for offset in ast['offsets']:
@@ -469,6 +616,10 @@ while running:
                 direction = "UP"  # Asteroid down, thrust up (negative y)
             else:
                 direction = "DOWN"  # Asteroid up, thrust down (positive y)
+        # Tell spectators when a new alert starts
+        if spectator and not alert_reported:
+            spectator.event('alert', direction=direction, distance=round(min_dist, 2))
+        alert_reported = True
         # Blit pre-rendered warning
         screen.blit(warning_surfaces[direction], (width // 2 - warning_surfaces[direction].get_width() // 2, height // 2 - warning_surfaces[direction].get_height() // 2))
         # Play alert sound if not already playing or if 2 seconds have passed
@@ -477,6 +628,7 @@ while running:
             last_alert_time = current_time
             is_alerting = True
     else:
+        alert_reported = False
         # Stop alert sound if condition no longer met
         if is_alerting and alert_sound:
             alert_sound.stop()
@@ -533,10 +685,17 @@ while running:
     cam_y += vy * 0.1
     cam_z += vz * 0.1
 
+    # Hand off state to spectators (stores a reference only, never blocks)
+    if spectator:
+        spectator.publish({'x': cam_x, 'y': cam_y, 'z': cam_z, 'vx': vx, 'vy': vy, 'vz': vz,
+                           'fuel': fuel, 'thrusting': is_thrusting, 'alerting': current_alert})
+
     # Check for landing or crash
     if cam_z <= 0:
         if abs(vx) < 2 and abs(vy) < 2 and abs(vz) < 5 and abs(cam_x) < pad_size / 2 and abs(cam_y) < pad_size / 2:
             # Successful landing
+            if spectator:
+                spectator.event('landing', x=round(cam_x, 2), y=round(cam_y, 2), vz=round(vz, 2), fuel=fuel)
             pygame.mixer.music.stop()
             if thrust_sound:
                 thrust_sound.stop()
@@ -672,6 +831,8 @@ while running:
                 clock.tick(60)
         else:
             # Crash
+            if spectator:
+                spectator.event('crash', cause='surface', x=round(cam_x, 2), y=round(cam_y, 2), vz=round(vz, 2))
             pygame.mixer.music.stop()
             if thrust_sound:
                 thrust_sound.stop()
@@ -688,5 +849,7 @@ while running:
     pygame.display.flip()
     clock.tick(60)
 
+if spectator:
+    spectator.stop()
 pygame.quit()
 sys.exit()
\ No newline at end of file
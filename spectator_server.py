@@ -0,0 +1,352 @@
+import asyncio
+import argparse
+import collections
+import json
+import math
+import os
+import random
+import stat
+import threading
+import time
+
+# Local spectator/telemetry broadcast server for the Mars Rover Landing Game.
+# The game loop calls publish() and event() from its own thread. Both only store
+# a reference or append to a deque, so a frame never waits on a socket. An asyncio
+# loop on a daemon thread turns the latest state into newline-delimited JSON and
+# sends each subscriber a delta against the last state it received, at that
+# subscriber's own rate.
+#
+# Messages (one JSON object per line):
+#   {"type": "hello", "rate": 20, "asteroid_seed": ..., ...}   sent once on connect
+#   {"type": "state", "v": 7, "base": null, "data": {...}}     full state (base is null)
+#   {"type": "state", "v": 9, "base": 7, "data": {...}, "removed": [...]}
+#                                                              changed and removed keys since version 7
+#   {"type": "event", "event": "crash", "t": ..., ...}         crash, landing, alert, restart
+# A client may send {"rate": 5} to lower its update rate.
+
+DEFAULT_HOST = '127.0.0.1'  # Loopback only, spectators must be local
+DEFAULT_PORT = 8765
+DEFAULT_RATE = 20  # Updates per second per client
+MAX_RATE = 60  # No client is sent state faster than the game runs
+HISTORY_SECONDS = 5  # How long a snapshot stays usable as a delta base (one snapshot per broadcast tick)
+EVENT_BACKLOG = 256  # Events kept if the server thread falls behind
+HIGH_WATER = 64 * 1024  # Skip state updates for a client with this much unsent data
+DROP_WATER = 1024 * 1024  # Disconnect a client with this much unsent data
+FLOAT_PRECISION = 2  # Decimal places kept for float values
+
+
+# Function to encode one message as a JSON line
+def encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+
+# Function to round floats so sub-centimetre jitter does not count as a change
+def quantize(state):
+    return {k: round(v, FLOAT_PRECISION) if isinstance(v, float) else v for k, v in state.items()}
+
+
+# Function to compute the keys that changed from old to new, and the keys removed from old
+def make_delta(old, new):
+    changed = {k: v for k, v in new.items() if k not in old or old[k] != v}
+    removed = [k for k in old if k not in new]
+    return changed, removed
+
+
+# Function to apply a delta produced by make_delta to a state dict in place
+def apply_delta(state, changed, removed):
+    state.update(changed)
+    for k in removed:
+        state.pop(k, None)
+    return state
+
+
+# Function to remove a Unix socket at path, refusing to delete anything that is not a socket
+def _remove_socket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path} exists and is not a socket")
+    os.unlink(path)
+
+
+class _Client:
+    def __init__(self, writer, rate):
+        self.writer = writer
+        self.interval = 1.0 / rate
+        self.next_send = 0.0
+        self.version = None  # Snapshot version this client last received
+
+
+class SpectatorServer:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, rate=DEFAULT_RATE, info=None):
+        self.host = host
+        self.port = port
+        self.path = path  # Unix domain socket path, used instead of host/port when set
+        self.rate = max(1, min(rate, MAX_RATE))
+        self.info = dict(info or {})  # Static session data sent in the hello message
+        self.error = None
+        self._latest = None  # Latest state handed off by the game loop
+        self._taken = None  # Last state turned into a snapshot
+        self._events = collections.deque(maxlen=EVENT_BACKLOG)
+        self._history = collections.OrderedDict()  # version -> quantized snapshot
+        self._history_size = HISTORY_SECONDS * self.rate
+        self._version = 0
+        self._clients = set()
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    # Hand off the current game state. Pass a new dict each call; it is read from
+    # the server thread and must not be mutated afterwards.
+    def publish(self, state):
+        self._latest = state
+
+    # Queue an event (crash, landing, alert, ...) for every connected client
+    def event(self, kind, **data):
+        data['type'] = 'event'
+        data['event'] = kind
+        data['t'] = time.time()
+        self._events.append(data)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='spectator-server', daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        if self.error:
+            raise self.error
+        return self
+
+    def stop(self):
+        if self._loop and self._stop_event and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass  # Loop already shut down
+        if self._thread:
+            self._thread.join(2)
+
+    def address(self):
+        return self.path if self.path else f"{self.host}:{self.port}"
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if self.path:
+            _remove_socket(self.path)  # Stale socket from a previous session
+            server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+        else:
+            server = await asyncio.start_server(self._handle_client, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]  # Resolve port 0 to the bound port
+        self._ready.set()
+        broadcaster = asyncio.create_task(self._broadcast_loop())
+        try:
+            await self._stop_event.wait()
+        finally:
+            broadcaster.cancel()
+            server.close()
+            for client in list(self._clients):
+                client.writer.close()
+            self._clients.clear()
+            if self.path:
+                _remove_socket(self.path)
+
+    async def _handle_client(self, reader, writer):
+        client = _Client(writer, self.rate)
+        writer.write(encode(dict(self.info, type='hello', rate=self.rate)))
+        self._clients.add(client)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    rate = float(json.loads(line)['rate'])
+                except (ValueError, KeyError, TypeError):
+                    continue  # Ignore anything that is not a rate request
+                if math.isfinite(rate):
+                    client.interval = 1.0 / max(1.0, min(rate, self.rate))
+        except (ConnectionError, ValueError):
+            pass  # Client went away or sent an oversized line
+        finally:
+            self._clients.discard(client)
+            writer.close()
+
+    async def _broadcast_loop(self):
+        interval = 1.0 / self.rate
+        while True:
+            await asyncio.sleep(interval)
+            self._take_snapshot()
+            self._send_events()
+            self._send_state()
+
+    def _take_snapshot(self):
+        state = self._latest
+        if state is None or state is self._taken:
+            return
+        self._taken = state
+        snapshot = quantize(state)
+        if self._history and snapshot == self._history[self._version]:
+            return  # Nothing visible changed
+        self._version += 1
+        self._history[self._version] = snapshot
+        if len(self._history) > self._history_size:
+            self._history.popitem(last=False)
+
+    def _send_events(self):
+        if not self._events:
+            return
+        chunks = []
+        while self._events:
+            chunks.append(encode(self._events.popleft()))
+        payload = b''.join(chunks)
+        for client in list(self._clients):
+            self._write(client, payload)
+
+    def _send_state(self):
+        if not self._history:
+            return
+        now = self._loop.time()
+        version = self._version
+        current = self._history[version]
+        payloads = {}  # Encoded message per base version, shared by clients on the same base
+        for client in list(self._clients):
+            if client.version == version or now + 0.001 < client.next_send:
+                continue
+            if client.writer.transport.get_write_buffer_size() > HIGH_WATER:
+                continue  # Slow reader, it gets a larger delta once it catches up
+            payload = payloads.get(client.version)
+            if payload is None:
+                base = self._history.get(client.version)
+                if base is None:
+                    message = {'type': 'state', 'v': version, 'base': None, 'data': current}
+                else:
+                    changed, removed = make_delta(base, current)
+                    message = {'type': 'state', 'v': version, 'base': client.version, 'data': changed, 'removed': removed}
+                payload = payloads[client.version] = encode(message)
+            if self._write(client, payload):
+                client.version = version
+                client.next_send = max(client.next_send + client.interval, now)
+
+    def _write(self, client, payload):
+        transport = client.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size() > DROP_WATER:
+            self._clients.discard(client)
+            client.writer.close()
+            return False
+        client.writer.write(payload)
+        return True
+
+
+# Stand-in spectator: connects, rebuilds the state from deltas and counts messages
+async def _watch(args, stats):
+    if args.path:
+        reader, writer = await asyncio.open_unix_connection(args.path)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    if args.rate:
+        writer.write(encode({'rate': args.rate}))
+    state = {}
+    version = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            stats['bytes'] += len(line)
+            if message['type'] == 'state':
+                if message['base'] is None:
+                    state = dict(message['data'])
+                elif message['base'] == version:
+                    apply_delta(state, message['data'], message['removed'])
+                else:
+                    stats['errors'] += 1  # Delta against a version we never saw
+                version = message['v']
+                stats['states'] += 1
+            elif message['type'] == 'event':
+                stats['events'] += 1
+                if args.verbose:
+                    print(f"event: {message}")
+            elif message['type'] == 'hello' and args.verbose:
+                print(f"hello: {message}")
+    finally:
+        writer.close()
+        stats['last_state'] = state
+
+
+async def _watch_many(args):
+    stats = collections.Counter()
+    tasks = [asyncio.create_task(_watch(args, stats)) for _ in range(args.clients)]
+    done, pending = await asyncio.wait(tasks, timeout=args.seconds)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    failed = sum(1 for task in done if task.exception())
+    per_client = stats['states'] / max(args.clients, 1) / args.seconds
+    print(f"{args.clients} clients ({failed} failed), {stats['states']} states ({per_client:.1f}/s each), "
+          f"{stats['events']} events, {stats['bytes']} bytes, {stats['errors']} delta errors")
+    print(f"last state: {stats.get('last_state')}")
+
+
+# Synthetic lander feeding a server at 60 FPS, for running the stand-in client without the game
+def _serve_demo(args):
+    seed = random.randrange(2**32)
+    server = SpectatorServer(args.host, args.port, args.path, args.rate, info={'asteroid_seed': seed}).start()
+    print(f"Spectator demo server on {server.address()} (asteroid seed {seed})")
+    x, y, z = 0.0, 0.0, 20000.0
+    worst = 0.0
+    frame = 0
+    try:
+        while True:
+            z = z - 1.0 if z > 0 else 20000.0
+            x += math.sin(frame / 60.0)
+            start = time.perf_counter()
+            server.publish({'x': x, 'y': y, 'z': z, 'fuel': 1200 - frame % 1200, 'thrusting': frame % 120 < 30})
+            if frame % 300 == 0:
+                server.event('alert', direction='LEFT')
+            worst = max(worst, time.perf_counter() - start)
+            frame += 1
+            if frame % 600 == 0:
+                print(f"{server.client_count} clients, worst hand-off {worst * 1e6:.1f} us")
+                worst = 0.0
+            time.sleep(1 / 60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mars Rover Landing spectator server tools")
+    parser.add_argument('mode', choices=['watch', 'serve'], help="watch: stand-in spectator client(s); serve: demo server")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--path', help="Unix domain socket path instead of host/port")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Updates per second")
+    parser.add_argument('--clients', type=int, default=1, help="Number of stand-in clients to open")
+    parser.add_argument('--seconds', type=float, default=10, help="How long the stand-in clients watch")
+    parser.add_argument('--verbose', action='store_true', help="Print hello and event messages")
+    args = parser.parse_args()
+    if args.mode == 'serve':
+        _serve_demo(args)
+    else:
+        asyncio.run(_watch_many(args))
+
+
+if __name__ == '__main__':
+    main()